@@ -0,0 +1,78 @@
+import mmap
+import random
+import sys
+
+from deck import Deck
+from deck import StandardDeck
+
+
+MAGIC = b"CGDEALS1"
+DECK_SIZE = 52
+
+
+def write_deal_corpus(path: str, num_deals: int, seed=None):
+    """
+    Writes num_deals shuffled 52-card deals to a binary file.
+    Every deal is a fixed-size record of 52 bytes, each byte being the
+    index of a card in the order of a fresh StandardDeck.
+    The same seed always produces the same corpus.
+    """
+    if num_deals < 0:
+        raise ValueError(f"Number of deals must be positive (tried to write {num_deals})")
+    rng = random.Random(seed)
+    order = list(range(DECK_SIZE))
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for _ in range(num_deals):
+            rng.shuffle(order)
+            f.write(bytes(order))
+
+
+class DealCorpus:
+    """
+    Read-only view of a deal corpus written by write_deal_corpus.
+    The file is memory-mapped so that several processes can share it
+    without each of them reading it into memory.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a deal corpus file")
+        num_bytes = len(self._mmap) - len(MAGIC)
+        if num_bytes % DECK_SIZE != 0:
+            self._mmap.close()
+            raise ValueError(f"{path} contains a truncated deal")
+        self._num_deals = num_bytes // DECK_SIZE
+
+    def __len__(self):
+        return self._num_deals
+
+    def __getitem__(self, i: int) -> Deck:
+        """Returns the i:th deal as a new deck of cards."""
+        if i < 0:
+            i += self._num_deals
+        if not 0 <= i < self._num_deals:
+            raise IndexError(f"deal index out of range ({i})")
+        start = len(MAGIC) + i * DECK_SIZE
+        cards = StandardDeck()
+        return Deck(cards[card_idx] for card_idx in self._mmap[start:start + DECK_SIZE])
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print(f"Usage: {sys.argv[0]} OUTPUT_FILE NUM_DEALS [SEED]")
+        sys.exit(1)
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    write_deal_corpus(sys.argv[1], int(sys.argv[2]), seed)
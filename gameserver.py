@@ -1,15 +1,22 @@
 import asyncio
 import json
 import logging
+import time
+from typing import Optional
 
 from sanic import Sanic
+from sanic.response import json as json_response
 
 from hearts import HeartsGame
 from hearts import Player
 from hearts import RNGPlayer
+from spectators import SpectatorChannel
+from storage import FinishedGame
+from storage import GameStore
 from utils import NotOk
 from utils import Ok
 from utils import Result
+from utils import TokenBucket
 
 logging.basicConfig(
     format="[%(levelname)s] [%(asctime)s] %(message)s",
@@ -18,6 +25,24 @@ logging.basicConfig(
 )
 app = Sanic("SanicHeartsGame")
 
+# messages larger than this many bytes (UTF-8 encoded) are rejected without parsing
+MAX_MESSAGE_SIZE = 1024
+# frames larger than this close the connection before they are even buffered
+# (4 bytes per character is the worst case of a message within the limit)
+app.config.WEBSOCKET_MAX_SIZE = 4 * MAX_MESSAGE_SIZE
+# (rate per second, burst size) for all messages of a connection
+MESSAGE_RATE = (20, 40)
+# (rate per second, burst size) for each message type of a connection
+MESSAGE_TYPE_RATES = {
+    "CHAT": (2, 5),
+    "PLAY": (5, 10),
+    "START": (1, 2),
+}
+# chat messages sent within this many seconds are broadcast together
+CHAT_INTERVAL = 0.25
+# spectators get at most this many batches of updates per second (0 = no limit)
+SPECTATOR_UPDATES_PER_SECOND = 4
+
 
 class InvalidMoveException(Exception):
     pass
@@ -57,24 +82,50 @@ class WebSocketPlayer(Player):
             self.selection = None
 
 
+class RateLimiter:
+    """Per-connection token buckets for incoming messages"""
+
+    def __init__(self):
+        self.all_messages = TokenBucket(*MESSAGE_RATE)
+        self.by_type = {msg_type: TokenBucket(*rate) for msg_type, rate in MESSAGE_TYPE_RATES.items()}
+
+    def allow_message(self) -> bool:
+        return self.all_messages.consume()
+
+    def allow_type(self, msg_type) -> bool:
+        bucket = self.by_type.get(msg_type)
+        return bucket is None or bucket.consume()
+
+
 class GameRoom:
     def __init__(self, room_id):
         self.room_id = room_id
         self.members = {}
+        self.spectators = SpectatorChannel(SPECTATOR_UPDATES_PER_SECOND)
         self.human_players = {}
         self.game = None
         self.host_name = None
         self.host = None
+        self.moves = []
+        self.game_saved = False
+        self.pending_chat = []
+        self.chat_flush = None
 
     @property
     def started(self):
         return self.game is not None
 
-    async def add_member(self, name, ws) -> Result:
-        if name in self.members:
+    def check_name(self, name) -> Result:
+        if name in self.members or name in self.spectators:
             return NotOk("Name already taken")
         if len(name) < 3 or len(name) > 24:
             return NotOk("Name needs to be at least 3 and at most 24 characters long")
+        return Ok()
+
+    async def add_member(self, name, ws) -> Result:
+        result = self.check_name(name)
+        if not result.is_ok:
+            return result
         if len(self.members) < 1:
             self.host_name = name
             self.host = ws
@@ -84,12 +135,26 @@ class GameRoom:
         await self.broadcast_users()
         return Ok()
 
+    async def add_spectator(self, name, ws) -> Result:
+        result = self.check_name(name)
+        if not result.is_ok:
+            return result
+        subscriber = self.spectators.subscribe(name, ws)
+        await subscriber.send(self.msg_state())
+        await subscriber.send(self.msg_users())
+        await self.broadcast_users()
+        return Ok()
+
     async def disconnect_member(self, name):
         self.members.pop(name)
         if name in self.human_players:
             self.human_players[name].ws = None
         await self.broadcast_users()
 
+    async def disconnect_spectator(self, name):
+        self.spectators.unsubscribe(name)
+        await self.broadcast_users()
+
     def msg_state(self) -> str:
         """Generate a message about the gameroom state"""
         if self.game and self.game.game_over:
@@ -107,23 +172,47 @@ class GameRoom:
         """Generate a message about the users in the gameroom"""
         users = list(self.members)
         players = [] if not self.started else [player.name for player in self.game.players]
-        return message("USERS", users=users, players=players, host=self.host_name)
+        return message(
+            "USERS",
+            users=users,
+            players=players,
+            host=self.host_name,
+            spectators=len(self.spectators)
+        )
 
     async def broadcast_state(self):
-        """Inform all members about the state of the gameroom"""
+        """Inform all members and spectators about the state of the gameroom"""
         msg = self.msg_state()
-        await self.broadcast(msg)
+        await self.send_members(msg)
+        self.spectators.publish_state("GAME_STATE", msg)
 
     async def broadcast_users(self):
-        """Inform all members about users in the room"""
+        """Inform all members and spectators about users in the room"""
         msg = self.msg_users()
-        await self.broadcast(msg)
+        await self.send_members(msg)
+        self.spectators.publish_state("USERS", msg)
 
     async def broadcast(self, msg):
-        """Send a message to all members in the gameroom (including non-players)"""
+        """Send a message to all members (including non-players) and spectators in the gameroom"""
+        await self.send_members(msg)
+        self.spectators.publish(msg)
+
+    async def send_members(self, msg):
         for ws in self.members.values():
             await ws.send(msg)
 
+    def queue_chat(self, sender, text):
+        """Queue a chat message to be broadcast with others sent around the same time"""
+        self.pending_chat.append({"sender": sender, "message": text})
+        if self.chat_flush is None:
+            self.chat_flush = asyncio.create_task(self.flush_chat())
+
+    async def flush_chat(self):
+        await asyncio.sleep(CHAT_INTERVAL)
+        messages, self.pending_chat = self.pending_chat, []
+        self.chat_flush = None
+        await self.broadcast(message("CHAT", messages=messages))
+
     def start_game(self):
         players = []
         for name, ws in self.members.items():
@@ -138,6 +227,17 @@ class GameRoom:
             players.append(rng_player)
             rng_player_idx += 1
         self.game = HeartsGame(players).start()
+        self.moves = []
+        self.game_saved = False
+
+    def save_game(self):
+        """Queue the finished game to be written to the database"""
+        if store is None or self.game_saved:
+            return
+        moves = self.moves if app.config.get("LOG_MOVES", True) else []
+        bots = [player.name for player in self.game.players if player.name not in self.human_players]
+        store.save(FinishedGame(self.room_id, time.time(), self.game.player_scores(), moves, bots))
+        self.game_saved = True
 
     async def play(self):
         for current_player, trick in self.game:
@@ -153,6 +253,7 @@ class GameRoom:
             if not play_result.is_ok:
                 await current_player.info(play_result.reason)
                 return
+            self.moves.append((current_player.name, chosen_card))
             if self.game.trick_finished:
                 trick_winner = self.game.last_trick_winner.name
                 msg = message(
@@ -167,6 +268,7 @@ class GameRoom:
                     await self.broadcast(message("SCORES", scores=scores))
 
             await self.broadcast_state()
+        self.save_game()
 
 
 def message(msg_type, **kwargs):
@@ -178,13 +280,28 @@ def infomsg(msg):
     return message("INFO", text=msg)
 
 
-async def handle_ws_message(gameroom, username, ws, recvd):
+async def handle_ws_message(gameroom, username, ws, recvd, limiter, spectating=False):
+    if not limiter.allow_message():
+        logging.debug(f"[{gameroom.room_id}] rate limited {username}")
+        return
+    size = len(recvd.encode()) if isinstance(recvd, str) else len(recvd)
+    if size > MAX_MESSAGE_SIZE:
+        await ws.send(infomsg("message too long"))
+        return
     try:
         msg_obj = json.loads(recvd)
     except json.JSONDecodeError:
         await ws.send(infomsg("invalid message"))
         return
     logging.debug(f"received {msg_obj=}")
+    msg_type = msg_obj.get("msg_type") if isinstance(msg_obj, dict) else None
+    if spectating and msg_type in ("PLAY", "START"):
+        await ws.send(infomsg("Spectators can't play"))
+        return
+    if not limiter.allow_type(msg_type):
+        logging.debug(f"[{gameroom.room_id}] rate limited {msg_type} from {username}")
+        await ws.send(infomsg("You are sending messages too fast, try again in a moment"))
+        return
     match(gameroom.started, msg_obj):
         case(False, {"msg_type": "START"}):
             if ws is gameroom.host:
@@ -208,11 +325,9 @@ async def handle_ws_message(gameroom, username, ws, recvd):
                 return
             await gameroom.play()
             await player.tell_cards()
-            state_message = gameroom.msg_state()
-            await gameroom.broadcast(state_message)
-        case(_, {"msg_type": "CHAT", "message": chatmessage}):
-            msg = message("CHAT", sender=username, message=chatmessage)
-            await gameroom.broadcast(msg)
+            await gameroom.broadcast_state()
+        case(_, {"msg_type": "CHAT", "message": str(chatmessage)}):
+            gameroom.queue_chat(username, chatmessage)
         case _:
             print(f"Invalid message {msg_obj=}")
 
@@ -246,6 +361,7 @@ async def game(request, ws):
     args = request.get_args()
     room_id = args.get("rid") or generate_id()
     name = args.get("name") or generate_name()
+    spectating = args.get("spectate") in ("1", "true")
 
     if room_id not in rooms:
         rooms[room_id] = GameRoom(room_id)
@@ -253,33 +369,75 @@ async def game(request, ws):
 
     gameroom = rooms[room_id]
     # TODO: if there is disconnected player with same name steal their spot
-    result = await gameroom.add_member(name, ws)
+    if spectating:
+        result = await gameroom.add_spectator(name, ws)
+    else:
+        result = await gameroom.add_member(name, ws)
     if not result.is_ok:
         await ws.send(infomsg(f"Unable to join game room ({result.reason})"))
         await ws.close()
         return
 
-    await ws.send(infomsg(f"Connected to game room {room_id}"))
-    logging.info(f"[{room_id}] {name} connected")
+    sender = ws
+    if spectating:
+        # everything sent to a spectator goes through its subscriber so that sends don't overlap
+        sender = gameroom.spectators.subscribers[name]
+    await sender.send(infomsg(f"Connected to game room {room_id}"))
+    logging.info(f"[{room_id}] {name} connected{' as a spectator' if spectating else ''}")
 
+    limiter = RateLimiter()
     try:
         while True:
             recvd = await ws.recv()
-            await handle_ws_message(gameroom, name, ws, recvd)
+            await handle_ws_message(gameroom, name, sender, recvd, limiter, spectating)
     except asyncio.exceptions.CancelledError:
         # websocket connection closed or lost
-        await gameroom.disconnect_member(name)
+        if spectating:
+            await gameroom.disconnect_spectator(name)
+        else:
+            await gameroom.disconnect_member(name)
         logging.info(f"[{room_id}] {name} disconnected")
-        if not gameroom.members:
+        if not gameroom.members and not gameroom.spectators:
             rooms.pop(room_id)
             logging.info(f"[{room_id}] GameRoom deleted")
-        elif name == gameroom.host_name:
+        elif name == gameroom.host_name and gameroom.members:
             gameroom.host_name, gameroom.host = next(iter(gameroom.members.items()))
             await gameroom.host.send(message("HOST"))
             logging.info(f"[{room_id}] {gameroom.host_name} is the new host")
+        elif name == gameroom.host_name:
+            # only spectators are left, the next member to join becomes the host
+            gameroom.host_name, gameroom.host = None, None
+
+
+@app.get("/leaderboard")
+async def leaderboard(request):
+    if store is None:
+        return json_response([])
+    return json_response(await asyncio.to_thread(store.leaderboard))
+
+
+@app.get("/history/<name>")
+async def history(request, name):
+    if store is None:
+        return json_response([])
+    return json_response(await asyncio.to_thread(store.player_history, name))
+
+
+@app.listener("before_server_start")
+async def open_store(app, loop):
+    global store
+    store = GameStore(app.config.get("GAMES_DB", "cardgames.sqlite3")).start()
+
+
+@app.listener("after_server_stop")
+async def close_store(app, loop):
+    # flushes the games that have not been written yet
+    if store is not None:
+        await asyncio.to_thread(store.close)
 
 
 rooms: dict[str, GameRoom] = {}
+store: Optional[GameStore] = None
 
 if __name__ == "__main__":
     app.run(debug=False)
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import logging
+
+
+class Subscriber:
+    """
+    A spectator's connection. Messages are sent by a single task at a time,
+    so they arrive in order. Messages queued while a send is in progress are
+    merged, keeping only the latest state message of each type.
+    Sends never overlap as long as everything sent to the spectator,
+    including direct replies, goes through the subscriber (see send).
+    """
+
+    def __init__(self, ws, max_pending_events):
+        self.ws = ws
+        self.max_pending_events = max_pending_events
+        self.events = []
+        self.states = {}
+        self.task = None
+        self.failed = False
+
+    def push(self, events, states) -> bool:
+        """
+        Queues messages to be sent. Returns False if the subscriber is
+        too far behind (or its connection has failed) and should be dropped.
+        """
+        if self.failed or len(self.events) + len(events) > self.max_pending_events:
+            return False
+        self.events.extend(events)
+        self.states.update(states)
+        if self.task is None:
+            self.task = asyncio.create_task(self._drain())
+        return True
+
+    async def send(self, msg):
+        """Queues a message for this spectator only. Can be used in place of the websocket."""
+        self.push([msg], {})
+
+    async def _drain(self):
+        try:
+            while self.events or self.states:
+                batch = self.events + list(self.states.values())
+                self.events = []
+                self.states = {}
+                for msg in batch:
+                    await self.ws.send(msg)
+        except Exception as exc:
+            logging.debug(f"Sending to spectator failed: {exc}")
+            self.failed = True
+        finally:
+            self.task = None
+
+    async def close(self):
+        with contextlib.suppress(Exception):
+            await self.ws.close()
+
+
+class SpectatorChannel:
+    """
+    Shared channel for spectators of a gameroom. Messages are encoded once
+    and handed to all spectators in batches at most `updates_per_second` times
+    per second. Events are all delivered in order, but only the latest
+    state message of each type in a batch is sent. Spectators that fall more
+    than `max_pending_events` events behind are disconnected.
+    """
+
+    def __init__(self, updates_per_second=0, max_pending_events=64):
+        self.subscribers = {}
+        self.interval = 1 / updates_per_second if updates_per_second else 0
+        self.max_pending_events = max_pending_events
+        self.events = []
+        self.states = {}
+        self.flush_task = None
+        self.last_flush = 0.0
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def __contains__(self, name):
+        return name in self.subscribers
+
+    def subscribe(self, name, ws) -> Subscriber:
+        subscriber = Subscriber(ws, self.max_pending_events)
+        self.subscribers[name] = subscriber
+        return subscriber
+
+    def unsubscribe(self, name):
+        self.subscribers.pop(name, None)
+
+    def publish(self, msg):
+        """Queue an event message for all spectators"""
+        if self.subscribers:
+            self.events.append(msg)
+            self._schedule_flush()
+
+    def publish_state(self, msg_type, msg):
+        """Queue a state message, replacing any queued message of the same type"""
+        if self.subscribers:
+            self.states[msg_type] = msg
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        delay = self.last_flush + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        events, states = self.events, self.states
+        self.events = []
+        self.states = {}
+        self.last_flush = loop.time()
+        for name, subscriber in list(self.subscribers.items()):
+            if not subscriber.push(events, states):
+                logging.info(f"Dropping spectator {name} who is not keeping up")
+                self.unsubscribe(name)
+                subscriber.task = asyncio.create_task(subscriber.close())
+        self.flush_task = None
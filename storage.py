@@ -0,0 +1,203 @@
+import collections
+import contextlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+
+# bots are the names of players in scores that are not humans
+FinishedGame = collections.namedtuple(
+    "FinishedGame",
+    ("room_id", "finished_at", "scores", "moves", "bots"),
+    defaults=((),)
+)
+
+# a batch that fails because another writer holds the database is retried
+# this many times, waiting twice as long before each attempt
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    room_id TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS round_scores (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    round INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    is_bot INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    seq INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    suit TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_finished_at ON games(finished_at);
+CREATE INDEX IF NOT EXISTS round_scores_game ON round_scores(game_id);
+CREATE INDEX IF NOT EXISTS round_scores_player ON round_scores(player, game_id);
+CREATE INDEX IF NOT EXISTS moves_game ON moves(game_id, seq);
+"""
+
+
+class GameStore:
+    """
+    Persists finished games to a SQLite database.
+    Games are written by a background thread that commits them in batches,
+    so calling save() never waits for the disk.
+    """
+
+    def __init__(self, path: str, max_queue_size: int = 1000, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # several server workers may write to the same database
+        return sqlite3.connect(self.path, timeout=30)
+
+    def start(self):
+        """Starts the background writer. Must be called before saving games."""
+        self._thread = threading.Thread(target=self._writer, name="GameStoreWriter", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Writes all games still in the queue to the database and stops the writer."""
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def save(self, game: FinishedGame) -> bool:
+        """
+        Queues a finished game to be written to the database.
+        Returns False (and drops the game) if the queue is full.
+        """
+        try:
+            self._queue.put_nowait(game)
+        except queue.Full:
+            logging.warning(f"[{game.room_id}] GameStore queue is full, game was not saved")
+            return False
+        return True
+
+    def _writer(self):
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [game for game in batch if game is not None]
+            # unexpected errors must not stop the writer, otherwise the queue would fill up for good
+            try:
+                self._write_batch(conn, batch)
+            except Exception:
+                # save the games one at a time so that one broken game doesn't lose the others
+                for game in batch:
+                    try:
+                        self._write_batch(conn, [game])
+                    except Exception:
+                        logging.exception(f"[{game.room_id}] Failed to save game")
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        delay = RETRY_DELAY
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                with conn:
+                    for game in batch:
+                        self._insert(conn, game)
+                return
+            except sqlite3.OperationalError as exc:
+                if attempt == WRITE_ATTEMPTS:
+                    logging.error(f"Failed to save {len(batch)} games after {attempt} attempts: {exc}")
+                    return
+                logging.warning(f"Failed to save {len(batch)} games ({exc}), retrying in {delay}s")
+                time.sleep(delay)
+                delay *= 2
+            except sqlite3.Error as exc:
+                logging.error(f"Failed to save {len(batch)} games: {exc}")
+                return
+
+    @staticmethod
+    def _insert(conn, game: FinishedGame):
+        cursor = conn.execute(
+            "INSERT INTO games (room_id, finished_at) VALUES (?, ?)",
+            (game.room_id, game.finished_at)
+        )
+        game_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO round_scores (game_id, round, player, is_bot, points) VALUES (?, ?, ?, ?, ?)",
+            [
+                (game_id, round_idx, player, player in game.bots, points)
+                for player, round_scores in game.scores.items()
+                for round_idx, points in enumerate(round_scores, 1)
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO moves (game_id, seq, player, suit, value) VALUES (?, ?, ?, ?, ?)",
+            [
+                (game_id, seq, player, card.suit.name, card.value)
+                for seq, (player, card) in enumerate(game.moves)
+            ]
+        )
+
+    def leaderboard(self, limit: int = 10) -> list[dict]:
+        """
+        Returns human players ordered by their average points per game (lower is better).
+        Blocks on the database, so call it from a thread when inside the event loop.
+        """
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT player, COUNT(DISTINCT game_id) AS games, SUM(points) AS points
+                FROM round_scores
+                WHERE NOT is_bot
+                GROUP BY player
+                ORDER BY CAST(SUM(points) AS REAL) / COUNT(DISTINCT game_id), player
+                LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        return [{"player": player, "games": games, "points": points} for player, games, points in rows]
+
+    def player_history(self, player: str, limit: int = 10) -> list[dict]:
+        """
+        Returns the latest games the player has played, newest first.
+        Blocks on the database, so call it from a thread when inside the event loop.
+        """
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT games.id, games.room_id, games.finished_at, SUM(round_scores.points)
+                FROM round_scores
+                JOIN games ON games.id = round_scores.game_id
+                WHERE round_scores.player = ?
+                GROUP BY games.id
+                ORDER BY games.finished_at DESC, games.id DESC
+                LIMIT ?
+                """,
+                (player, limit)
+            ).fetchall()
+        return [
+            {"game_id": game_id, "room_id": room_id, "finished_at": finished_at, "points": points}
+            for game_id, room_id, finished_at, points in rows
+        ]
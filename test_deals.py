@@ -0,0 +1,56 @@
+import pytest
+
+from deals import DealCorpus
+from deals import write_deal_corpus
+from hearts import HeartsGame
+from hearts import RNGPlayer
+
+
+def test_corpus_roundtrip(tmp_path):
+    path = tmp_path / "deals.bin"
+    write_deal_corpus(path, 10, seed=1234)
+    with DealCorpus(path) as corpus:
+        assert len(corpus) == 10
+        deal = corpus[3]
+        assert len(deal) == 52
+        assert len({str(card) for card in deal}) == 52
+        assert [str(card) for card in corpus[-1]] == [str(card) for card in corpus[9]]
+        with pytest.raises(IndexError):
+            corpus[10]
+
+
+def test_corpus_is_reproducible(tmp_path):
+    write_deal_corpus(tmp_path / "a.bin", 5, seed=42)
+    write_deal_corpus(tmp_path / "b.bin", 5, seed=42)
+    assert (tmp_path / "a.bin").read_bytes() == (tmp_path / "b.bin").read_bytes()
+
+
+def test_corpus_rejects_other_files(tmp_path):
+    path = tmp_path / "garbage.bin"
+    path.write_bytes(b"not a corpus at all")
+    with pytest.raises(ValueError):
+        DealCorpus(path)
+
+
+def test_hearts_deals_from_corpus(tmp_path):
+    path = tmp_path / "deals.bin"
+    write_deal_corpus(path, 3, seed=7)
+    with DealCorpus(path) as corpus:
+        expected = [str(card) for card in corpus[1]]
+        players = [RNGPlayer(name) for name in ("Alice", "Bob", "Cleo", "Dimitri")]
+        game = HeartsGame(players, deals=corpus, first_deal=1).start()
+        dealt = {str(card) for player in players for card in player.cards}
+        assert dealt == set(expected)
+        # cards are taken from the end of the deck, so the first player gets the last 13
+        assert {str(card) for card in players[0].cards} == set(expected[-13:])
+        assert game.next_deal == 2
+
+
+def test_hearts_rejects_empty_corpus(tmp_path):
+    path = tmp_path / "deals.bin"
+    write_deal_corpus(path, 0)
+    with DealCorpus(path) as corpus:
+        assert len(corpus) == 0
+        players = [RNGPlayer(name) for name in ("Alice", "Bob", "Cleo", "Dimitri")]
+        with pytest.raises(ValueError):
+            HeartsGame(players, deals=corpus)
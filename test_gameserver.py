@@ -0,0 +1,132 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+pytest.importorskip("sanic")
+
+import gameserver  # noqa: E402
+from gameserver import GameRoom  # noqa: E402
+from gameserver import handle_ws_message  # noqa: E402
+from gameserver import RateLimiter  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(json.loads(msg))
+
+
+def new_room():
+    room = GameRoom("abc12")
+    ws = FakeWebSocket()
+    room.members["Alice"] = ws
+    return room, ws
+
+
+def chat(text):
+    return json.dumps({"msg_type": "CHAT", "message": text}, ensure_ascii=False)
+
+
+def test_oversized_messages_are_not_parsed(monkeypatch):
+    def fail(*args):
+        raise AssertionError("oversized message was parsed")
+
+    parser = types.SimpleNamespace(loads=fail, dumps=json.dumps, JSONDecodeError=json.JSONDecodeError)
+    monkeypatch.setattr(gameserver, "json", parser)
+    room, ws = new_room()
+    # fewer characters than the limit, but more bytes
+    recvd = chat("€" * (gameserver.MAX_MESSAGE_SIZE // 2))
+    assert len(recvd) < gameserver.MAX_MESSAGE_SIZE
+    asyncio.run(handle_ws_message(room, "Alice", ws, recvd, RateLimiter()))
+    assert ws.sent == [{"msg_type": "INFO", "text": "message too long"}]
+    assert room.pending_chat == []
+
+
+def test_oversized_messages_use_up_the_rate_limit():
+    room, ws = new_room()
+    limiter = RateLimiter()
+    recvd = chat("x" * gameserver.MAX_MESSAGE_SIZE)
+
+    async def run():
+        for _ in range(2 * gameserver.MESSAGE_RATE[1]):
+            await handle_ws_message(room, "Alice", ws, recvd, limiter)
+
+    asyncio.run(run())
+    assert len(ws.sent) <= gameserver.MESSAGE_RATE[1] + 1
+
+
+def test_message_type_rate_limit(monkeypatch):
+    monkeypatch.setattr(gameserver, "CHAT_INTERVAL", 0.01)
+    room, ws = new_room()
+    limiter = RateLimiter()
+    burst = gameserver.MESSAGE_TYPE_RATES["CHAT"][1]
+
+    async def run():
+        for i in range(burst + 1):
+            await handle_ws_message(room, "Alice", ws, chat(f"hello {i}"), limiter)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    info, chat_msg = ws.sent
+    assert info["msg_type"] == "INFO"
+    assert chat_msg["msg_type"] == "CHAT"
+    assert [msg["message"] for msg in chat_msg["messages"]] == [f"hello {i}" for i in range(burst)]
+
+
+def test_chat_is_coalesced(monkeypatch):
+    monkeypatch.setattr(gameserver, "CHAT_INTERVAL", 0.01)
+    room, ws = new_room()
+    bob = FakeWebSocket()
+    room.members["Bob"] = bob
+
+    async def run():
+        room.queue_chat("Alice", "hi")
+        room.queue_chat("Bob", "hello")
+        await asyncio.sleep(0.05)
+        room.queue_chat("Alice", "bye")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    expected = [
+        {"msg_type": "CHAT", "messages": [
+            {"sender": "Alice", "message": "hi"},
+            {"sender": "Bob", "message": "hello"},
+        ]},
+        {"msg_type": "CHAT", "messages": [{"sender": "Alice", "message": "bye"}]},
+    ]
+    assert ws.sent == expected
+    assert bob.sent == expected
+
+
+def test_spectators_cannot_play():
+    room, ws = new_room()
+    room.start_game()
+    room.game.verbose = False
+    spectator_ws = FakeWebSocket()
+
+    async def run():
+        await room.add_spectator("Eve", spectator_ws)
+        subscriber = room.spectators.subscribers["Eve"]
+        play = json.dumps({"msg_type": "PLAY", "card_index": 0})
+        await handle_ws_message(room, "Eve", subscriber, play, RateLimiter(), spectating=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert {"msg_type": "INFO", "text": "Spectators can't play"} in spectator_ws.sent
+    assert all(len(player.cards) == 13 for player in room.game.players)
+
+
+def test_disconnected_player_can_rejoin():
+    room, ws = new_room()
+    room.start_game()
+    room.game.verbose = False
+
+    async def run():
+        await room.disconnect_member("Alice")
+        return await room.add_member("Alice", FakeWebSocket())
+
+    assert asyncio.run(run()).is_ok
@@ -0,0 +1,102 @@
+import asyncio
+
+from spectators import SpectatorChannel
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay=0.0):
+        self.send_delay = send_delay
+        self.sent = []
+        self.sending = 0
+        self.max_sending = 0
+        self.closed = False
+
+    async def send(self, msg):
+        self.sending += 1
+        self.max_sending = max(self.max_sending, self.sending)
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(msg)
+        self.sending -= 1
+
+    async def close(self):
+        self.closed = True
+
+
+def test_events_in_order_and_latest_state_only():
+    async def run():
+        channel = SpectatorChannel()
+        ws = FakeWebSocket()
+        channel.subscribe("watcher", ws)
+        for i in range(3):
+            channel.publish(f"event{i}")
+            channel.publish_state("GAME_STATE", f"state{i}")
+        await asyncio.sleep(0.01)
+        return ws.sent
+
+    assert asyncio.run(run()) == ["event0", "event1", "event2", "state2"]
+
+
+def test_throttling():
+    async def run():
+        channel = SpectatorChannel(updates_per_second=10)
+        ws = FakeWebSocket()
+        channel.subscribe("watcher", ws)
+        channel.publish_state("GAME_STATE", "state0")
+        await asyncio.sleep(0.01)
+        channel.publish_state("GAME_STATE", "state1")
+        channel.publish_state("GAME_STATE", "state2")
+        await asyncio.sleep(0.01)
+        # the second batch waits for the interval to pass
+        sent_early = list(ws.sent)
+        await asyncio.sleep(0.15)
+        return sent_early, ws.sent
+
+    sent_early, sent = asyncio.run(run())
+    assert sent_early == ["state0"]
+    assert sent == ["state0", "state2"]
+
+
+def test_slow_spectator():
+    async def run():
+        channel = SpectatorChannel(max_pending_events=3)
+        slow = FakeWebSocket(send_delay=0.05)
+        fast = FakeWebSocket()
+        channel.subscribe("slow", slow)
+        channel.subscribe("fast", fast)
+        for i in range(3):
+            channel.publish(f"event{i}")
+            channel.publish_state("GAME_STATE", f"state{i}")
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.3)
+        sent = (list(slow.sent), list(fast.sent), slow.max_sending)
+        # falling too far behind gets the spectator disconnected
+        for i in range(5):
+            channel.publish(f"more{i}")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        return sent, slow.closed, "slow" in channel, fast.closed
+
+    (slow_sent, fast_sent, max_sending), slow_closed, subscribed, fast_closed = asyncio.run(run())
+    assert fast_sent == ["event0", "state0", "event1", "state1", "event2", "state2"]
+    # messages queued during a slow send are merged and never sent concurrently
+    assert slow_sent == ["event0", "state0", "event1", "event2", "state2"]
+    assert max_sending == 1
+    assert slow_closed and not subscribed
+    assert not fast_closed
+
+
+def test_direct_messages_do_not_overlap_broadcasts():
+    async def run():
+        channel = SpectatorChannel()
+        ws = FakeWebSocket(send_delay=0.01)
+        subscriber = channel.subscribe("watcher", ws)
+        channel.publish("event0")
+        await asyncio.sleep(0)
+        await subscriber.send("reply")
+        channel.publish("event1")
+        await asyncio.sleep(0.1)
+        return ws.sent, ws.max_sending
+
+    sent, max_sending = asyncio.run(run())
+    assert sent == ["event0", "reply", "event1"]
+    assert max_sending == 1
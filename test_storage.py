@@ -0,0 +1,58 @@
+import sqlite3
+
+import storage
+from deck import Card
+from deck import Suits
+from storage import FinishedGame
+from storage import GameStore
+
+
+def test_store_saves_on_close(tmp_path):
+    store = GameStore(tmp_path / "games.sqlite3").start()
+    moves = [("Alice", Card(Suits.CLUBS, "2")), ("Bob", Card(Suits.CLUBS, "A"))]
+    assert store.save(FinishedGame("abc12", 1.0, {"Alice": [0, 26], "Bob": [13, 0]}, moves))
+    assert store.save(FinishedGame("abc13", 2.0, {"Alice": [10], "Cleo": [2], "RNGPlayer1": [0]}, [],
+                                   bots=["RNGPlayer1"]))
+    store.close()
+
+    assert store.leaderboard() == [
+        {"player": "Cleo", "games": 1, "points": 2},
+        {"player": "Bob", "games": 1, "points": 13},
+        {"player": "Alice", "games": 2, "points": 36},
+    ]
+    history = store.player_history("Alice")
+    assert [(game["room_id"], game["points"]) for game in history] == [("abc13", 10), ("abc12", 26)]
+    assert [game["finished_at"] for game in history] == [2.0, 1.0]
+
+
+def test_store_retries_locked_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "RETRY_DELAY", 0.01)
+    insert = GameStore._insert
+    failures = [sqlite3.OperationalError("database is locked")] * 2
+
+    def flaky_insert(conn, game):
+        if failures:
+            raise failures.pop()
+        insert(conn, game)
+
+    monkeypatch.setattr(GameStore, "_insert", staticmethod(flaky_insert))
+    store = GameStore(tmp_path / "games.sqlite3").start()
+    store.save(FinishedGame("abc12", 1.0, {"Alice": [3]}, []))
+    store.close()
+    assert store.leaderboard() == [{"player": "Alice", "games": 1, "points": 3}]
+
+
+def test_store_drops_games_when_queue_is_full(tmp_path):
+    # the writer is not started so nothing is taken from the queue
+    store = GameStore(tmp_path / "games.sqlite3", max_queue_size=1)
+    assert store.save(FinishedGame("abc12", 1.0, {"Alice": [1]}, []))
+    assert not store.save(FinishedGame("abc13", 2.0, {"Alice": [2]}, []))
+
+
+def test_store_survives_unexpected_errors(tmp_path):
+    store = GameStore(tmp_path / "games.sqlite3").start()
+    # scores that can't be iterated make the insert raise a TypeError
+    store.save(FinishedGame("abc12", 1.0, None, []))
+    store.save(FinishedGame("abc13", 2.0, {"Alice": [4]}, []))
+    store.close()
+    assert store.leaderboard() == [{"player": "Alice", "games": 1, "points": 4}]
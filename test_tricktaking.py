@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from deck import Card
+from deck import Deck
+from deck import Suits
+from hearts import HeartsGame
+from hearts import RNGPlayer
+from tricktaking import TrickTakingRules
+
+
+@pytest.mark.parametrize("trick,trump_suit,expected", [
+    ([(Suits.CLUBS, "2"), (Suits.CLUBS, "A"), (Suits.HEARTS, "A"), (Suits.CLUBS, "10")], None, 1),
+    ([(Suits.SPADES, "5"), (Suits.HEARTS, "K"), (Suits.DIAMONDS, "A"), (Suits.CLUBS, "A")], None, 0),
+    ([(Suits.CLUBS, "2"), (Suits.CLUBS, "A"), (Suits.HEARTS, "3"), (Suits.HEARTS, "2")],
+     Suits.HEARTS, 2),
+])
+def test_trick_winner(trick, trump_suit, expected):
+    rules = TrickTakingRules(num_players=4, cards_per_player=13, trump_suit=trump_suit)
+    assert rules.trick_winner(Deck(Card(*card) for card in trick)) == expected
+
+
+def test_rules_tables():
+    rules = TrickTakingRules(num_players=4, cards_per_player=13, card_points={(Suits.SPADES, "Q"): 13})
+    assert rules.max_points_per_round == 13
+    assert rules.score([Card(Suits.SPADES, "Q"), Card(Suits.HEARTS, "Q")]) == 13
+    with pytest.raises(ValueError):
+        TrickTakingRules(num_players=5, cards_per_player=13)
+
+
+def new_game():
+    players = [RNGPlayer(name) for name in ("Alice", "Bob", "Cleo", "Dimitri")]
+    game = HeartsGame(players).start()
+    game.verbose = False
+    return game
+
+
+def test_hearts_opening_and_follow_suit():
+    game = new_game()
+    legal_moves = game.legal_moves(game.current_player.cards)
+    assert [card.long_name for card in legal_moves] == ["Two of clubs"]
+    game.play_card(legal_moves[0])
+    hand = game.current_player.cards
+    legal_moves = game.legal_moves(hand)
+    if any(card.suit == Suits.CLUBS for card in hand):
+        assert all(card.suit == Suits.CLUBS for card in legal_moves)
+    else:
+        assert len(legal_moves) == len(hand)
+
+
+def test_hearts_game_finishes():
+    random.seed(1)
+    game = new_game()
+    for player, trick in game:
+        game.play_card(random.choice(game.legal_moves(player.cards)))
+    assert any(player.total_points >= game.point_limit for player in game.players)
+    for round_scores in zip(*game.player_scores().values()):
+        assert sum(round_scores) in (26, 3 * 26)
+
+
+def test_legal_moves_match_check_move():
+    rng = random.Random(3)
+    for _ in range(5):
+        game = new_game()
+        for player, trick in game:
+            legal_moves = game.legal_moves(player.cards)
+            assert legal_moves == [card for card in player.cards if game.check_move(card)]
+            # cards given in another deck are filtered the same way
+            assert game.legal_moves(Deck(reversed(player.cards))) == legal_moves[::-1]
+            game.play_card(rng.choice(legal_moves))
+
+
+def test_clone_and_playout_do_not_change_game():
+    game = new_game()
+    game.play_card(game.legal_moves(game.current_player.cards)[0])
+    hands = [list(player.cards) for player in game.players]
+    clone = game.clone()
+    clone.play_card(clone.legal_moves(clone.current_player.cards)[0])
+    points = game.playout()
+    assert sum(points) in (26, 3 * 26)
+    assert [list(player.cards) for player in game.players] == hands
+    assert len(game.trick) == 1
+    assert all(player.points == [] for player in game.players)
+
+
+def test_playout_does_not_use_global_rng():
+    game = new_game()
+    state = random.getstate()
+    game.playout(choose=random.Random(1).choice)
+    assert random.getstate() == state
+
+
+def test_playout_needs_a_round_in_progress():
+    players = [RNGPlayer(name) for name in ("Alice", "Bob", "Cleo", "Dimitri")]
+    with pytest.raises(ValueError):
+        HeartsGame(players).playout()
+    game = HeartsGame(players, point_limit=1).start()
+    game.verbose = False
+    for player, trick in game:
+        game.play_card(random.choice(game.legal_moves(player.cards)))
+    with pytest.raises(ValueError):
+        game.playout()
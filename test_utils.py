@@ -0,0 +1,17 @@
+from utils import TokenBucket
+
+
+def test_token_bucket():
+    now = 0.0
+    bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now)
+    # a full bucket allows a burst of `capacity` events
+    assert all(bucket.consume() for _ in range(3))
+    assert not bucket.consume()
+    # tokens are refilled at `rate` per second
+    now = 0.5
+    assert bucket.consume()
+    assert not bucket.consume()
+    # but never above capacity
+    now = 100.0
+    assert all(bucket.consume() for _ in range(3))
+    assert not bucket.consume()
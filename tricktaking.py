@@ -0,0 +1,363 @@
+import copy
+import random
+from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Optional
+
+from deck import Card
+from deck import Deck
+from deck import StandardDeck
+from deck import Suits
+from utils import NotOk
+from utils import Ok
+from utils import Result
+
+
+SUIT_BITS = {suit: 1 << i for i, suit in enumerate(Suits)}
+DEFAULT_SUIT_ORDER = (Suits.CLUBS, Suits.DIAMONDS, Suits.SPADES, Suits.HEARTS)
+
+
+def card_key(card: Card) -> tuple[Suits, str]:
+    return card.suit, card.value
+
+
+def suit_mask(cards) -> int:
+    """Returns a bitmask of the suits (see SUIT_BITS) found in the cards."""
+    mask = 0
+    for card in cards:
+        mask |= SUIT_BITS[card.suit]
+    return mask
+
+
+class TrickTakingRules:
+    """
+    Describes a trick-taking game with tables that are computed once,
+    so that the game engine only needs lookups while playing.
+
+    num_players: number of players, each of them gets cards_per_player cards
+    card_points: points for collecting a card, keyed by (suit, value)
+    rank_order: card values from lowest to highest
+    trump_suit: suit that beats all other suits (or None)
+    opening_card: (suit, value) of the card that must lead the first trick of a round
+    breaking_suit: suit that can't be led before it has been played in a trick
+    suit_order: order of suits when sorting a hand
+    """
+
+    def __init__(
+        self,
+        num_players: int,
+        cards_per_player: int,
+        card_points: Optional[dict[tuple[Suits, str], int]] = None,
+        rank_order: Sequence[str] = StandardDeck.CARD_VALUES,
+        trump_suit: Optional[Suits] = None,
+        opening_card: Optional[tuple[Suits, str]] = None,
+        breaking_suit: Optional[Suits] = None,
+        suit_order: Sequence[Suits] = DEFAULT_SUIT_ORDER,
+        deck_factory=StandardDeck
+    ):
+        self.num_players = num_players
+        self.cards_per_player = cards_per_player
+        self.trump_suit = trump_suit
+        self.opening_card = opening_card
+        self.breaking_suit = breaking_suit
+        self.deck_factory = deck_factory
+        if num_players * cards_per_player > len(deck_factory()):
+            raise ValueError(
+                f"Not enough cards to deal {cards_per_player} cards to {num_players} players"
+            )
+
+        keys = [card_key(card) for card in deck_factory()]
+        rank = {value: i for i, value in enumerate(rank_order)}
+        self.points = {key: 0 for key in keys}
+        self.points.update(card_points or {})
+        self.max_points_per_round = sum(self.points.values())
+        self.sort_order = {
+            (suit, value): suit_order.index(suit) * len(rank) + rank[value] for suit, value in keys
+        }
+        # strength of each card in a trick for every possible led suit:
+        # trumps beat the led suit, which beats everything else
+        self.trick_strength = {
+            led_suit: {
+                (suit, value): (
+                    2 * len(rank) + rank[value] if suit == trump_suit
+                    else len(rank) + rank[value] if suit == led_suit
+                    else -1
+                )
+                for suit, value in keys
+            }
+            for led_suit in Suits
+        }
+
+    def score(self, cards) -> int:
+        points = self.points
+        return sum(points[card_key(card)] for card in cards)
+
+    def trick_winner(self, trick: Deck) -> int:
+        """Returns the index of the winning card in the trick."""
+        strength = self.trick_strength[trick[0].suit]
+        return max(range(len(trick)), key=lambda i: strength[card_key(trick[i])])
+
+
+class TrickTakingGame:
+    """
+    Game engine for trick-taking games described by TrickTakingRules.
+    Players are expected to have the attributes of hearts.Player
+    (cards, collected_cards, points, give_points, reset and total_points).
+    Games with special scoring should override round_points.
+    """
+
+    def __init__(
+        self,
+        players: list,
+        rules: TrickTakingRules,
+        point_limit: int,
+        deals: Optional[Sequence[Deck]] = None,
+        first_deal: int = 0
+    ):
+        """
+        If deals (for example a deals.DealCorpus) is given, every round is dealt
+        from it starting at index first_deal instead of shuffling a new deck.
+        The index wraps around silently when the deals run out.
+        """
+        if len(players) != rules.num_players:
+            raise ValueError(f"only {rules.num_players} player games are supported right now")
+        if deals is not None and len(deals) == 0:
+            raise ValueError("deals must contain at least one deal")
+        self.rules = rules
+        self.CARDS_PER_PLAYER = rules.cards_per_player
+        self.MAX_POINTS_PER_ROUND = rules.max_points_per_round
+        self.players = players
+        self._current_player_idx = 0
+        self.game_over = False
+        self.point_limit = point_limit
+        self.suit_broken = False
+        self.deck = rules.deck_factory()
+        self.deals = deals
+        self.next_deal = first_deal
+        self.trick = Deck()
+        self.trick_number = 1
+        self.trick_finished = False
+        self.last_trick = None
+        self.last_trick_winner = None
+        self.last_starter_idx = 0
+        self.verbose = True
+        # simulations stop at the end of the round instead of dealing a new one
+        self.deal_next_round = True
+
+    def log(self, *args):
+        if self.verbose:
+            print(*args)
+
+    @property
+    def current_player(self):
+        return self.players[self._current_player_idx]
+
+    def __iter__(self) -> Iterator[tuple]:
+        while not self.game_over:
+            yield self.current_player, self.trick
+
+    def start(self):
+        """
+        Sets up a fresh game. Must be called before playing cards with `play_card()`.
+        """
+        for player in self.players:
+            player.reset()
+        self._initialize_round()
+        return self
+
+    def legal_moves(self, cards: Deck) -> list[Card]:
+        """
+        Returns a list of cards in the given deck that could be legally played
+        in the current state of the game.
+        """
+        hand = self.current_player.cards
+        if cards is not hand:
+            owned = {id(card) for card in hand}
+            cards = [card for card in cards if id(card) in owned]
+        # same rules as _check_rules, but filtering whole suits at once
+        # instead of building a Result for every card
+        rules = self.rules
+        if self.trick:
+            required = self.trick[0].suit
+            if any(card.suit is required for card in hand):
+                return [card for card in cards if card.suit is required]
+            return list(cards)
+        if self.trick_number == 1 and rules.opening_card is not None:
+            opening_card = rules.opening_card
+            cards = [card for card in cards if card_key(card) == opening_card]
+        breaking_suit = rules.breaking_suit
+        if not self.suit_broken and breaking_suit is not None:
+            if any(card.suit is not breaking_suit for card in hand):
+                return [card for card in cards if card.suit is not breaking_suit]
+        return list(cards)
+
+    def check_move(self, card: Card) -> Result:
+        """
+        Returns a truthy Result if the card can be legally played in the
+        current state of the game.
+        Otherwise returns a falsey Result with a reason.
+        """
+        hand = self.current_player.cards
+        if card not in hand:
+            return NotOk("The current player does not own that card!")
+        return self._check_rules(card, suit_mask(hand))
+
+    def _check_rules(self, card: Card, hand_mask: int) -> Result:
+        rules = self.rules
+        if len(self.trick) == 0:
+            if (
+                self.trick_number == 1
+                and rules.opening_card is not None
+                and card_key(card) != rules.opening_card
+            ):
+                opening_card = Card(*rules.opening_card).long_name.lower()
+                return NotOk(f"A round must start with the {opening_card}!")
+            if not self.suit_broken and card.suit == rules.breaking_suit:
+                if hand_mask & ~SUIT_BITS[card.suit]:
+                    suit_name = card.suit.name.capitalize()
+                    return NotOk(f"{suit_name} can't be played before they are opened!")
+        else:
+            required = self.trick[0].suit
+            if card.suit != required and hand_mask & SUIT_BITS[required]:
+                return NotOk("The play must follow suit!")
+        return Ok()
+
+    def play_card(self, card: Card) -> Result:
+        """
+        Advances game state if the played card was a valid move.
+        Sets trick_finished if the play finished a trick.
+        """
+        self.trick_finished = False
+        check_result = self.check_move(card)
+        if not check_result.is_ok:
+            return check_result
+        self._apply_move(card)
+        return Ok()
+
+    def _apply_move(self, card: Card):
+        self.current_player.cards.remove(card)
+        self.trick.append(card)
+        self._current_player_idx += 1
+        self._current_player_idx %= len(self.players)
+
+        if len(self.trick) == len(self.players):
+            self._finish_trick()
+
+    def clone(self):
+        """
+        Returns a copy of the game (and its players) that can be played
+        without affecting this game, for example to simulate moves.
+        """
+        game = copy.copy(self)
+        game.players = [copy.copy(player) for player in self.players]
+        for player in game.players:
+            player.cards = Deck(player.cards)
+            player.collected_cards = Deck(player.collected_cards)
+            player.points = list(player.points)
+        if self.last_trick_winner is not None:
+            game.last_trick_winner = game.players[self.players.index(self.last_trick_winner)]
+        game.deck = Deck(self.deck)
+        game.trick = Deck(self.trick)
+        game.verbose = False
+        return game
+
+    def playout(self, choose=random.choice) -> list[int]:
+        """
+        Plays the rest of the current round on a clone of the game,
+        choosing each move from the legal moves with `choose`.
+        Returns the points each player got from the round.
+        Raises ValueError if no round is in progress.
+        """
+        if self.game_over or not self.current_player.cards:
+            raise ValueError("There is no round in progress to play out")
+        game = self.clone()
+        game.deal_next_round = False
+        round_idx = len(game.players[0].points)
+        while len(game.players[0].points) == round_idx:
+            # legal moves don't need to be checked again
+            game._apply_move(choose(game.legal_moves(game.current_player.cards)))
+        return [player.points[round_idx] for player in game.players]
+
+    def player_scores(self) -> dict[str, list[int]]:
+        return {player.name: player.points for player in self.players}
+
+    def scoresheet(self) -> str:
+        scores = self.player_scores()
+        COL_WIDTH = 11
+        scoresheet = []
+        if self.game_over:
+            scoresheet.append("FINAL SCORES:")
+        else:
+            scoresheet.append("CURRENT SCORES:")
+        scoresheet.append("=" * (len(scores) * COL_WIDTH + (len(scores) - 1) * 3))
+        scoresheet.append(" | ".join(f"{player:^{COL_WIDTH}}" for player in scores))
+        for round_scores in zip(*scores.values()):
+            scoresheet.append(" | ".join(f"{score:^{COL_WIDTH}}" for score in round_scores))
+        if self.game_over:
+            scoresheet.append("-|-".join(["-" * COL_WIDTH] * len(scores)))
+            scoresheet.append(" | ".join(f"{sum(scores):^{COL_WIDTH}}" for scores in scores.values()))
+        return "\n".join(scoresheet)
+
+    def round_points(self) -> list[int]:
+        """Returns the points each player gets at the end of a round."""
+        return [self.rules.score(player.collected_cards) for player in self.players]
+
+    def _initialize_round(self):
+        rules = self.rules
+        if self.deals is None:
+            self.deck = rules.deck_factory().shuffle()
+        else:
+            self.deck = self.deals[self.next_deal % len(self.deals)]
+            self.next_deal += 1
+        sort_order = rules.sort_order
+        for player in self.players:
+            player.collected_cards = Deck()
+            player_cards = self.deck.take(self.CARDS_PER_PLAYER)
+            player_cards.sort(key=lambda card: sort_order[card_key(card)])
+            player.cards = player_cards
+
+        # the player who has the opening card starts
+        self._current_player_idx = 0
+        if rules.opening_card is not None:
+            for i, player in enumerate(self.players):
+                if any(card_key(card) == rules.opening_card for card in player.cards):
+                    self._current_player_idx = i
+                    break
+
+        self.trick_number = 1
+        self.suit_broken = False
+        self.trick = Deck()
+
+    def _finish_trick(self):
+        self.trick_finished = True
+        if not self.suit_broken and self.rules.breaking_suit is not None:
+            if suit_mask(self.trick) & SUIT_BITS[self.rules.breaking_suit]:
+                self.suit_broken = True
+
+        # "winner" collects cards and begins the next trick
+        winner_index = self.rules.trick_winner(self.trick)
+        self.last_trick = self.trick
+        self.last_starter_idx = self._current_player_idx
+        winning_player_index = (self.last_starter_idx + winner_index) % len(self.players)
+        self.last_trick_winner = self.players[winning_player_index]
+        self._current_player_idx = winning_player_index
+
+        winner = self.current_player
+        self.log(f"{winner.name} takes the trick")
+        winner.collected_cards.extend(self.trick)
+        self.trick_number += 1
+        self.trick = Deck()
+        if self.trick_number > self.CARDS_PER_PLAYER:
+            self._finish_round()
+
+    def _finish_round(self):
+        self._score_round()
+        if any(player.total_points >= self.point_limit for player in self.players):
+            self.game_over = True
+        elif self.deal_next_round:
+            self._initialize_round()
+
+    def _score_round(self):
+        self.log("\nRound over! Results:")
+        for player, points in zip(self.players, self.round_points()):
+            player.give_points(points)
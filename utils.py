@@ -1,4 +1,5 @@
 import collections
+import time
 
 
 class Result(collections.namedtuple("Result", ("is_ok", "reason"))):
@@ -12,3 +13,26 @@ def NotOk(reason):
 
 def Ok():
     return Result(is_ok=True, reason="")
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to `capacity` events, refilled at `rate` events per second.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.last_refill = clock()
+
+    def consume(self, n: float = 1) -> bool:
+        """Takes n tokens from the bucket. Returns False if there were not enough."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True